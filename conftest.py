@@ -0,0 +1,2 @@
+# Root conftest: pytest puts this directory on sys.path, so tests can
+# import `src.…` and `run_pipeline_v2` under a bare `pytest` run.
@@ -1,32 +1,45 @@
 """
 run_pipeline_v2.py
 
-Runs the NBA Player Prop Model v2 pipeline in order using your current folder structure.
+Runs the NBA Player Prop Model v2 pipeline using your current folder structure.
 
 Pipeline order:
 1) src/data/fetch_odds.py
+   (concurrently: src/features_v2/build_features_v2.py --warm-team-stats)
 2) src/data/clean_odds.py
 3) src/features_v2/build_features_v2.py
 4) src/simulations_v2/run_simulations_v2.py
 5) src/selection_v2/build_portfolio_v2.py
 6) src/graphics/build_excel_card_v2.py
+
+Each step starts as soon as the steps it depends on have finished.
+Python v2 steps run in-process via their main() on the main thread; only the
+I/O-bound team-stats warm-up uses a worker thread (pass --isolate to run every
+step as a separate interpreter instead).
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import importlib
 import os
 import sys
-import subprocess
+import traceback
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable
 
 
 @dataclass(frozen=True)
 class Step:
     name: str
     script: Path
+    args: tuple[str, ...] = ()
+    deps: frozenset[str] = frozenset()  # names of steps that must finish first
+    entrypoint: str | None = None  # "package.module:function" to run in-process
+    threaded: bool = False  # run the in-process entrypoint on a worker thread (I/O-only steps)
 
 
 def try_load_dotenv() -> None:
@@ -45,19 +58,70 @@ def require_files(steps: Iterable[Step]) -> None:
         raise FileNotFoundError(f"Missing pipeline file(s):\n{msg}")
 
 
-def run_step(step: Step, *, python: str, cwd: Path) -> None:
-    print(f"\n=== {step.name} ===")
-    print(f"{step.script}")
-
-    proc = subprocess.run([python, str(step.script)], cwd=str(cwd), check=False)
+def load_entrypoint(spec: str) -> Callable[[list[str]], int]:
+    module_name, func_name = spec.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+async def run_step(step: Step, *, python: str, cwd: Path, limit: asyncio.Semaphore, isolate: bool) -> None:
+    async with limit:
+        print(f"\n=== {step.name} ===")
+        print(f"{step.script}")
+
+        if step.entrypoint and not isolate:
+            # A subprocess prints its own traceback; in-process failures have to do it here
+            try:
+                entry = load_entrypoint(step.entrypoint)
+                if step.threaded:
+                    returncode = await asyncio.to_thread(entry, list(step.args))
+                else:
+                    # Blocks the loop, but keeps numba/BLAS work on the main thread
+                    returncode = entry(list(step.args))
+            except Exception as e:
+                traceback.print_exc()
+                raise RuntimeError(f"Step failed: {step.name} ({type(e).__name__})") from e
+        else:
+            proc = await asyncio.create_subprocess_exec(python, str(step.script), *step.args, cwd=str(cwd))
+            try:
+                returncode = await proc.wait()
+            except asyncio.CancelledError:
+                proc.kill()
+                raise
+
+    if returncode != 0:
+        raise RuntimeError(f"Step failed: {step.name} (exit code {returncode})")
+
+
+async def run_pipeline(steps: list[Step], *, python: str, cwd: Path, max_parallel: int, isolate: bool) -> None:
+    """
+    Schedule steps by their dependencies, running up to max_parallel at once.
+    Steps must be listed after their dependencies; dependencies on steps that
+    are not in the list (e.g. skipped) count as satisfied.
+    """
+    limit = asyncio.Semaphore(max_parallel)
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run_after_deps(step: Step) -> None:
+        await asyncio.gather(*(tasks[d] for d in step.deps if d in tasks))
+        await run_step(step, python=python, cwd=cwd, limit=limit, isolate=isolate)
+
+    for step in steps:
+        tasks[step.name] = asyncio.create_task(run_after_deps(step))
 
-    if proc.returncode != 0:
-        raise RuntimeError(f"Step failed: {step.name} (exit code {proc.returncode})")
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Run NBA Player Prop Model v2 pipeline.")
     parser.add_argument("--skip-fetch", action="store_true", help="Skip fetching odds step.")
+    parser.add_argument("--max-parallel", type=int, default=2, help="Max pipeline steps running at once.")
+    parser.add_argument("--isolate", action="store_true", help="Run every step in its own Python process.")
     args = parser.parse_args()
 
     try_load_dotenv()
@@ -67,13 +131,27 @@ def main() -> int:
 
     src = root / "src"
 
+    features = src / "features_v2" / "build_features_v2.py"
+    # One timestamp for every archived output of this run
+    run_ts = ("--run-ts", datetime.now().strftime("%Y%m%d_%H%M%S"))
     steps = [
         Step("Fetch odds", src / "data" / "fetch_odds.py"),
-        Step("Clean odds", src / "data" / "clean_odds.py"),
-        Step("Build features (v2)", src / "features_v2" / "build_features_v2.py"),
-        Step("Run simulations (v2)", src / "simulations_v2" / "run_simulations_v2.py"),
-        Step("Build portfolio (v2)", src / "selection_v2" / "build_portfolio_v2.py"),
-        Step("Export Excel cards (v2)", src / "graphics" / "build_excel_card_v2.py"),
+        Step("Warm team stats (v2)", features, args=("--warm-team-stats",),
+             entrypoint="src.features_v2.build_features_v2:main", threaded=True),
+        Step("Clean odds", src / "data" / "clean_odds.py",
+             deps=frozenset({"Fetch odds"})),
+        Step("Build features (v2)", features,
+             deps=frozenset({"Clean odds", "Warm team stats (v2)"}),
+             entrypoint="src.features_v2.build_features_v2:main"),
+        Step("Run simulations (v2)", src / "simulations_v2" / "run_simulations_v2.py", args=run_ts,
+             deps=frozenset({"Build features (v2)"}),
+             entrypoint="src.simulations_v2.run_simulations_v2:main"),
+        Step("Build portfolio (v2)", src / "selection_v2" / "build_portfolio_v2.py", args=run_ts,
+             deps=frozenset({"Run simulations (v2)"}),
+             entrypoint="src.selection_v2.build_portfolio_v2:main"),
+        Step("Export Excel cards (v2)", src / "graphics" / "build_excel_card_v2.py",
+             deps=frozenset({"Build portfolio (v2)"}),
+             entrypoint="src.graphics.build_excel_card_v2:main"),
     ]
 
     if args.skip_fetch:
@@ -85,8 +163,8 @@ def main() -> int:
     try:
         require_files(steps)
         print("Starting pipeline...")
-        for step in steps:
-            run_step(step, python=python, cwd=root)
+        asyncio.run(run_pipeline(steps, python=python, cwd=root, max_parallel=max(1, args.max_parallel),
+                                 isolate=args.isolate))
         print("\n Pipeline complete.")
         return 0
     except Exception as e:
@@ -1,47 +1,164 @@
 import sys
 import os
+import argparse
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
+import re
 import time
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
-from datetime import datetime
+import requests_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
 
 from nba_api.stats.static import players as nba_players, teams as nba_teams
 from nba_api.stats.endpoints import playergamelog, commonplayerinfo, leaguedashteamstats
+from nba_api.stats.library.http import NBAStatsHTTP
 from rapidfuzz import process, fuzz
 
 # -----------------------------
 # Config
 # -----------------------------
 SEASON = "2025-26"  # adjust when needed
+MAX_WORKERS = 8  # concurrent NBA API fetches
+NBA_MIN_INTERVAL = 0.5  # seconds between request starts against stats.nba.com
+HTTP_CACHE_PATH = Path(__file__).resolve().parents[2] / "src" / "data" / "cache" / "nba_cache"
+HTTP_CACHE_EXPIRE = timedelta(hours=6)
+
+PLAYER_STAT_COLUMNS = [
+    # base rolling stats
+    "pts_last10_mean", "pts_last10_std",
+    "reb_last10_mean", "reb_last10_std",
+    "ast_last10_mean", "ast_last10_std",
+    "fg3_last10_mean", "fg3_last10_std",
+    "min_last10_mean", "min_last10_std",
+
+    "pts_last5_mean", "reb_last5_mean", "ast_last5_mean", "fg3_last5_mean", "min_last5_mean",
+]
+GAME_KEY_COLUMNS = ["player_team_api", "home_team", "away_team"]
+FEATURE_COLUMNS = PLAYER_STAT_COLUMNS + [
+    # per-minute
+    "pts_per_min_last10", "reb_per_min_last10", "ast_per_min_last10", "fg3_per_min_last10",
+
+    # pace/defense context
+    "player_team_name", "opp_team_name", "home_team_name", "away_team_name",
+    "team_pace", "opp_pace", "league_avg_pace",
+    "opp_defrtg", "league_avg_defrtg",
+    "pace_factor", "defense_factor",
+]
 
 # -----------------------------
 # Caches
 # -----------------------------
 PLAYER_ID_CACHE: dict[str, int | None] = {}
-PLAYER_INFO_CACHE: dict[int, dict] = {}
-PLAYER_STATS_CACHE: dict[tuple[int, int], dict] = {}
 TEAM_STATS_DF: pd.DataFrame | None = None
+TEAM_LOOKUP: dict[str, dict] = {}  # TEAM_NAME → {"PACE", "DEF_RATING"}
 TEAM_NAME_CACHE: dict[str, str] = {}  # raw → canonical TEAM_NAME
+_TEAM_STATS_FUTURE: Future | None = None  # in-flight background team stats fetch
+_BACKGROUND = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nba-prefetch")
+PLAYER_CACHE_SIZE = 2048  # max entries per bounded player cache (info, game logs, game-log stats)
 
 # -----------------------------
-# Helpers
+# Rate limiting
 # -----------------------------
+_RATE_LOCK = threading.Lock()
+_NEXT_REQUEST_AT = 0.0
+
+
 def nba_sleep():
-    time.sleep(0.5)
+    """
+    Global rate limiter shared by all fetch threads.
+    Each call reserves the next request slot and blocks until it arrives,
+    so requests start at most once every NBA_MIN_INTERVAL seconds.
+    """
+    global _NEXT_REQUEST_AT
+    with _RATE_LOCK:
+        now = time.monotonic()
+        wait = _NEXT_REQUEST_AT - now
+        _NEXT_REQUEST_AT = max(now, _NEXT_REQUEST_AT) + NBA_MIN_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+
+class ThrottledCachedSession(requests_cache.CachedSession):
+    """
+    sqlite-backed HTTP cache for nba_api (L2 behind the in-process dicts).
+    Only requests that actually go to stats.nba.com take a rate-limit slot.
+    """
 
+    def send(self, request, **kwargs):
+        cached = self.cache.get_response(self.cache.create_key(request))
+        if cached is None or cached.is_expired:
+            nba_sleep()
+        return super().send(request, **kwargs)
 
+
+@lru_cache(maxsize=1)
+def _install_http_cache() -> ThrottledCachedSession:
+    """
+    Create the on-disk HTTP cache and make it nba_api's (process-global) session.
+    Called by build_features_v2()/main() rather than at import, so importing
+    this module has no side effects.
+    """
+    HTTP_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    session = ThrottledCachedSession(str(HTTP_CACHE_PATH), backend="sqlite", expire_after=HTTP_CACHE_EXPIRE)
+    NBAStatsHTTP.set_session(session)
+    return session
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+@lru_cache(maxsize=1)
 def get_all_players():
     return nba_players.get_players()
 
 
+@lru_cache(maxsize=1)
 def get_all_teams():
     return nba_teams.get_teams()
 
 
+def normalize_name(name: str) -> str:
+    """Lowercase and drop everything but letters/digits ("P.J. Washington Jr." → "pjwashingtonjr")."""
+    return re.sub(r"[^a-z0-9]+", "", name.lower())
+
+
+@lru_cache(maxsize=64)
+def _normalized_index(candidates: tuple) -> dict[str, str]:
+    """Normalized candidate → candidate (first listed candidate wins on ties)."""
+    return {normalize_name(c): c for c in reversed(candidates) if isinstance(c, str)}
+
+
+@lru_cache(maxsize=1)
+def _player_name_index() -> MappingProxyType:
+    """Normalized full_name → player id (first listed player wins on ties)."""
+    return MappingProxyType({normalize_name(p["full_name"]): p["id"] for p in reversed(get_all_players())})
+
+
+@lru_cache(maxsize=1)
+def _player_full_name_index() -> MappingProxyType:
+    """Exact full_name → player id (first listed player wins on ties)."""
+    return MappingProxyType({p["full_name"]: p["id"] for p in reversed(get_all_players())})
+
+
 def fuzzy_match_name(name: str, candidates: list[str], min_score: int = 80):
     if not isinstance(name, str):
         return None, 0
+    return _fuzzy_match_cached(name, tuple(candidates), min_score)
+
+
+@lru_cache(maxsize=4096)
+def _fuzzy_match_cached(name: str, candidates: tuple, min_score: int):
+    # Exact match after normalization needs no scoring
+    exact = _normalized_index(candidates).get(normalize_name(name))
+    if exact is not None:
+        return exact, 100.0
+
     match = process.extractOne(name, candidates, scorer=fuzz.WRatio)
     if match is None:
         return None, 0
@@ -51,47 +168,93 @@ def fuzzy_match_name(name: str, candidates: list[str], min_score: int = 80):
     return None, score
 
 
-def get_player_id(player_name: str) -> int | None:
-    if player_name in PLAYER_ID_CACHE:
-        return PLAYER_ID_CACHE[player_name]
+def _batch_fuzzy_match(queries: list[str], candidates: list[str], min_score: int = 80):
+    """
+    Best WRatio match for every query in one rapidfuzz.process.cdist call.
+    Returns a list of (best, score) pairs, best=None below min_score.
+    """
+    scores = process.cdist(queries, candidates, scorer=fuzz.WRatio, dtype=np.float64, workers=-1)
+    best_idx = scores.argmax(axis=1)
+    best_scores = scores[np.arange(len(queries)), best_idx]
+    return [
+        (candidates[idx] if score >= min_score else None, float(score))
+        for idx, score in zip(best_idx, best_scores)
+    ]
 
-    all_players = get_all_players()
+
+def resolve_player_ids(player_names) -> None:
+    """
+    Populate PLAYER_ID_CACHE for all names not yet resolved:
+    exact (normalized) match first, then one batched fuzzy pass.
+    """
+    misses = [p for p in dict.fromkeys(player_names) if p not in PLAYER_ID_CACHE]
+    if not misses:
+        return
 
     # exact
-    for p in all_players:
-        if p["full_name"].lower() == player_name.lower():
-            PLAYER_ID_CACHE[player_name] = p["id"]
-            return p["id"]
+    name_index = _player_name_index()
+    fuzzy_queries = []
+    for player_name in misses:
+        pid = name_index.get(normalize_name(player_name))
+        if pid is not None:
+            PLAYER_ID_CACHE[player_name] = pid
+        else:
+            fuzzy_queries.append(player_name)
+
+    if not fuzzy_queries:
+        return
 
     # fuzzy
-    names = [p["full_name"] for p in all_players]
-    best, score = fuzzy_match_name(player_name, names, min_score=80)
-    if best:
-        matched = next(p for p in all_players if p["full_name"] == best)
-        print(f"[MATCH] '{player_name}' → '{matched['full_name']}' (score={score})")
-        PLAYER_ID_CACHE[player_name] = matched["id"]
-        return matched["id"]
+    id_by_name = _player_full_name_index()
+    names = [p["full_name"] for p in get_all_players()]
+    for player_name, (best, score) in zip(fuzzy_queries, _batch_fuzzy_match(fuzzy_queries, names, min_score=80)):
+        if best:
+            print(f"[MATCH] '{player_name}' → '{best}' (score={score})")
+            PLAYER_ID_CACHE[player_name] = id_by_name[best]
+        else:
+            print(f"[WARN] No player match for '{player_name}'")
+            PLAYER_ID_CACHE[player_name] = None
+
 
-    print(f"[WARN] No player match for '{player_name}'")
-    PLAYER_ID_CACHE[player_name] = None
-    return None
+def get_player_id(player_name: str) -> int | None:
+    resolve_player_ids([player_name])
+    return PLAYER_ID_CACHE[player_name]
 
 
-def get_player_info(player_id: int) -> dict:
-    if player_id in PLAYER_INFO_CACHE:
-        return PLAYER_INFO_CACHE[player_id]
+def get_player_info(player_id: int) -> MappingProxyType:
+    return _player_info(player_id)
 
+
+@lru_cache(maxsize=PLAYER_CACHE_SIZE)
+def _player_info(player_id: int) -> MappingProxyType:
     try:
         info = commonplayerinfo.CommonPlayerInfo(player_id=player_id)
-        nba_sleep()
         df = info.get_data_frames()[0]
         row = df.iloc[0].to_dict()
-        PLAYER_INFO_CACHE[player_id] = row
-        return row
     except Exception as e:
         print(f"[ERR] commonplayerinfo failed for {player_id}: {e}")
-        PLAYER_INFO_CACHE[player_id] = {}
-        return {}
+        row = {}
+
+    return MappingProxyType(row)
+
+
+def _fetch_team_stats_raw() -> pd.DataFrame:
+    stats = leaguedashteamstats.LeagueDashTeamStats(
+        season=SEASON,
+        per_mode_detailed="PerGame",
+        measure_type_detailed_defense="Base"
+    )
+    return stats.get_data_frames()[0].copy()
+
+
+def prefetch_team_stats() -> None:
+    """
+    Start the league team stats request on a background thread so its
+    latency overlaps with player resolution. No-op if already loaded/started.
+    """
+    global _TEAM_STATS_FUTURE
+    if TEAM_STATS_DF is None and _TEAM_STATS_FUTURE is None:
+        _TEAM_STATS_FUTURE = _BACKGROUND.submit(_fetch_team_stats_raw)
 
 
 def get_team_stats_df() -> pd.DataFrame:
@@ -99,18 +262,13 @@ def get_team_stats_df() -> pd.DataFrame:
     NBA removed Pace & Defensive Rating from early-season responses.
     This rebuilds them manually using standard basketball formulas.
     """
-    global TEAM_STATS_DF
+    global TEAM_STATS_DF, TEAM_LOOKUP, _TEAM_STATS_FUTURE
     if TEAM_STATS_DF is not None:
         return TEAM_STATS_DF
 
-    stats = leaguedashteamstats.LeagueDashTeamStats(
-        season=SEASON,
-        per_mode_detailed="PerGame",
-        measure_type_detailed_defense="Base"
-    )
-    nba_sleep()
-
-    df = stats.get_data_frames()[0].copy()
+    prefetch_team_stats()
+    future, _TEAM_STATS_FUTURE = _TEAM_STATS_FUTURE, None
+    df = future.result()
 
     # Sanity check
     required = ["TEAM_NAME", "FGA", "FTA", "OREB", "TOV", "PTS", "PLUS_MINUS"]
@@ -146,43 +304,77 @@ def get_team_stats_df() -> pd.DataFrame:
     # -------------------------------
     df["DEF_RATING"] = 100 * df["OPP_PTS"] / df["POSS"]
 
+    TEAM_LOOKUP = df.set_index("TEAM_NAME")[["PACE", "DEF_RATING"]].to_dict("index")
     TEAM_STATS_DF = df
     return df
 
 
 
-def map_raw_team_to_nba(raw_team_name: str) -> str | None:
+def resolve_team_names(raw_team_names) -> None:
     """
-    Map Odds API team name to NBA API TEAM_NAME using fuzzy match.
+    Populate TEAM_NAME_CACHE (Odds API team name → NBA API TEAM_NAME)
+    for all unmapped names: exact (normalized) match first, then one
+    batched fuzzy pass.
     """
-    if raw_team_name in TEAM_NAME_CACHE:
-        return TEAM_NAME_CACHE[raw_team_name]
+    misses = [t for t in dict.fromkeys(raw_team_names) if t not in TEAM_NAME_CACHE]
 
     df = get_team_stats_df()
     team_names = df["TEAM_NAME"].tolist()
-    best, score = fuzzy_match_name(raw_team_name, team_names, min_score=80)
-    if best:
+    name_index = _normalized_index(tuple(team_names))
+
+    matches = {}
+    queries = []
+    for t in misses:
+        if not isinstance(t, str):
+            continue
+        exact = name_index.get(normalize_name(t))
+        if exact is not None:
+            matches[t] = (exact, 100.0)
+        else:
+            queries.append(t)
+
+    if queries:
+        matches.update(zip(queries, _batch_fuzzy_match(queries, team_names, min_score=80)))
+
+    for raw_team_name in misses:
+        best, _ = matches.get(raw_team_name, (None, 0))
+        if not best:
+            print(f"[WARN] Could not map team name '{raw_team_name}'")
         TEAM_NAME_CACHE[raw_team_name] = best
-        return best
 
-    print(f"[WARN] Could not map team name '{raw_team_name}'")
-    TEAM_NAME_CACHE[raw_team_name] = None
-    return None
+
+def map_raw_team_to_nba(raw_team_name: str) -> str | None:
+    """
+    Map Odds API team name to NBA API TEAM_NAME using fuzzy match.
+    """
+    resolve_team_names([raw_team_name])
+    return TEAM_NAME_CACHE[raw_team_name]
 
 
-def get_last_n_stats(player_id: int, n: int = 10) -> dict:
+def get_last_n_stats(player_id: int, n: int = 10) -> MappingProxyType:
     """
     Returns mean & std for last n games for pts, reb, ast, fg3, minutes.
-    Cached by (player_id, n).
+    Cached by (player_id, n, season); every n is sliced from one game-log request.
     """
-    key = (player_id, n)
-    if key in PLAYER_STATS_CACHE:
-        return PLAYER_STATS_CACHE[key]
+    return _last_n_stats(player_id, n, SEASON)
+
 
+@lru_cache(maxsize=PLAYER_CACHE_SIZE)
+def _game_log(player_id: int, season: str) -> pd.DataFrame | None:
+    # Most recent game first; None if the request failed
     try:
-        logs = playergamelog.PlayerGameLog(player_id=player_id, season=SEASON)
-        nba_sleep()
-        df = logs.get_data_frames()[0].head(n)
+        logs = playergamelog.PlayerGameLog(player_id=player_id, season=season)
+        return logs.get_data_frames()[0][["PTS", "REB", "AST", "FG3M", "MIN"]]
+    except Exception as e:
+        print(f"[ERR] Game logs failed for player_id={player_id}: {e}")
+        return None
+
+
+@lru_cache(maxsize=PLAYER_CACHE_SIZE)
+def _last_n_stats(player_id: int, n: int, season: str) -> MappingProxyType:
+    log = _game_log(player_id, season)
+    if log is not None:
+        df = log.head(n)
         stats = {
             "pts_mean": df["PTS"].mean(),
             "pts_std": df["PTS"].std(ddof=1),
@@ -195,8 +387,7 @@ def get_last_n_stats(player_id: int, n: int = 10) -> dict:
             "min_mean": df["MIN"].mean(),
             "min_std": df["MIN"].std(ddof=1),
         }
-    except Exception as e:
-        print(f"[ERR] Game logs failed for player_id={player_id}: {e}")
+    else:
         stats = {
             "pts_mean": None, "pts_std": None,
             "reb_mean": None, "reb_std": None,
@@ -205,157 +396,213 @@ def get_last_n_stats(player_id: int, n: int = 10) -> dict:
             "min_mean": None, "min_std": None,
         }
 
-    PLAYER_STATS_CACHE[key] = stats
-    return stats
-
+    return MappingProxyType(stats)
 
-def build_features_v2(df_props: pd.DataFrame) -> pd.DataFrame:
-    df_props = df_props.copy()
 
-    team_stats = get_team_stats_df()
-    league_avg_pace = team_stats["PACE"].mean()
-    league_avg_defrtg = team_stats["DEF_RATING"].mean()
+def clear_caches() -> None:
+    """Drop the in-process NBA caches and the on-disk HTTP cache."""
+    global TEAM_STATS_DF, TEAM_LOOKUP, _TEAM_STATS_FUTURE
+    _normalized_index.cache_clear()
+    _player_info.cache_clear()
+    _game_log.cache_clear()
+    _last_n_stats.cache_clear()
+    PLAYER_ID_CACHE.clear()
+    TEAM_NAME_CACHE.clear()
+    TEAM_STATS_DF = None
+    TEAM_LOOKUP = {}
+    _TEAM_STATS_FUTURE = None
+    _install_http_cache().cache.clear()
 
-    rows = []
 
-    unique_players = df_props["player_name"].unique()
-    print(f"[INFO V2] Unique players: {len(unique_players)}")
+def prefetch_player_data(player_ids) -> None:
+    """
+    Warm the player info / game-log stats caches for every player concurrently.
+    Requests are network-bound, so workers overlap their latency while
+    the session's nba_sleep() keeps the overall request rate unchanged.
+    """
+    jobs = [(get_player_info, (pid,)) for pid in player_ids]
+    # One game-log request per player; last-5 stats are later sliced from the cached log
+    jobs += [(get_last_n_stats, (pid, 10)) for pid in player_ids]
 
-    # Pre-resolve player IDs
-    for p in unique_players:
-        get_player_id(p)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(lambda job: job[0](*job[1]), jobs))
 
-    for _, row in df_props.iterrows():
-        player_name = row["player_name"]
-        pid = PLAYER_ID_CACHE.get(player_name)
-        if pid is None:
-            continue
 
-        # Player team info
-        info = get_player_info(pid)
-        player_team_abbrev = info.get("TEAM_ABBREVIATION")
-        player_team_name = info.get("TEAM_NAME")  # NBA API canonical
-        if not player_team_name:
-            # Fallback: infer from home/away via fuzzy
-            player_team_name = None
-
-                # Determine opponent using REAL NBA team, not sportsbook team guess
-        home_raw = row["home_team"]
-        away_raw = row["away_team"]
-
-        # Map sportsbook team names → official NBA team names
-        home_team_name = map_raw_team_to_nba(home_raw)
-        away_team_name = map_raw_team_to_nba(away_raw)
-
-        # First: make sure we have a mapped NBA team from API
-        # Replace NBA API "TEAM_NAME" (often full) with fuzzy-matched canonical name
-        if player_team_name:
-            matched_real_team, score = fuzzy_match_name(
-                player_team_name,
-                [home_team_name, away_team_name],
-                min_score=50
-            )
-            if matched_real_team:
-                player_team_name = matched_real_team
-
-        # Now determine correct opponent:
-        if player_team_name == home_team_name:
+def resolve_game_teams(player_team_name: str | None, home_raw: str, away_raw: str) -> tuple[str, str]:
+    """
+    Returns (player_team_name, opp_team_name) as NBA API TEAM_NAMEs for a prop,
+    given the player's API team and the sportsbook's home/away team names.
+    """
+    if not player_team_name:
+        # Fallback: infer from home/away via fuzzy
+        player_team_name = None
+
+    # Determine opponent using REAL NBA team, not sportsbook team guess
+    # Map sportsbook team names → official NBA team names
+    home_team_name = map_raw_team_to_nba(home_raw)
+    away_team_name = map_raw_team_to_nba(away_raw)
+
+    # First: make sure we have a mapped NBA team from API
+    # Replace NBA API "TEAM_NAME" (often full) with fuzzy-matched canonical name
+    if player_team_name:
+        matched_real_team, score = fuzzy_match_name(
+            player_team_name,
+            [home_team_name, away_team_name],
+            min_score=50
+        )
+        if matched_real_team:
+            player_team_name = matched_real_team
+
+    # Now determine correct opponent:
+    if player_team_name == home_team_name:
+        opp_team_name = away_team_name
+    elif player_team_name == away_team_name:
+        opp_team_name = home_team_name
+    else:
+        # If the player's real team is not home or away,
+        # pick the opponent as whichever team is NOT closest to the player's real team.
+        # This fixes mismatches like "Charlotte Hornets" vs "LA Clippers"
+        matched_home, home_score = fuzzy_match_name(player_team_name, [home_team_name], min_score=50)
+        matched_away, away_score = fuzzy_match_name(player_team_name, [away_team_name], min_score=50)
+
+        if home_score > away_score:
+            player_team_name = home_team_name
             opp_team_name = away_team_name
-        elif player_team_name == away_team_name:
-            opp_team_name = home_team_name
         else:
-            # If the player's real team is not home or away,
-            # pick the opponent as whichever team is NOT closest to the player's real team.
-            # This fixes mismatches like "Charlotte Hornets" vs "LA Clippers"
-            matched_home, home_score = fuzzy_match_name(player_team_name, [home_team_name], min_score=50)
-            matched_away, away_score = fuzzy_match_name(player_team_name, [away_team_name], min_score=50)
-
-            if home_score > away_score:
-                player_team_name = home_team_name
-                opp_team_name = away_team_name
-            else:
-                player_team_name = away_team_name
-                opp_team_name = home_team_name
-
-        # Get pace & defense for team and opp
-        team_row = team_stats[team_stats["TEAM_NAME"] == player_team_name] if player_team_name else pd.DataFrame()
-        opp_row = team_stats[team_stats["TEAM_NAME"] == opp_team_name] if opp_team_name else pd.DataFrame()
-
-        if not team_row.empty:
-            team_pace = float(team_row.iloc[0]["PACE"])
-        else:
-            team_pace = league_avg_pace
+            player_team_name = away_team_name
+            opp_team_name = home_team_name
 
-        if not opp_row.empty:
-            opp_pace = float(opp_row.iloc[0]["PACE"])
-            opp_defrtg = float(opp_row.iloc[0]["DEF_RATING"])
-        else:
-            opp_pace = league_avg_pace
-            opp_defrtg = league_avg_defrtg
+    return player_team_name, opp_team_name
 
-        pace_factor = (team_pace + opp_pace) / (2.0 * league_avg_pace)
-        # Lower DEF_RATING = better defense, so <1 means harder matchup
-        defense_factor = league_avg_defrtg / opp_defrtg if opp_defrtg else 1.0
 
-        # Rolling stats
+def build_player_frame(player_ids) -> pd.DataFrame:
+    """
+    One row per player id: NBA API team plus last-10 / last-5 rolling stats
+    and last-10 per-minute rates. Reads from the (pre-warmed) player caches.
+    """
+    rows = []
+    for pid in player_ids:
         last10 = get_last_n_stats(pid, n=10)
         last5 = get_last_n_stats(pid, n=5)
 
-        # Per-minute rates (last10)
-        min_mean10 = last10["min_mean"] or 0
-        if min_mean10 > 0:
-            pts_per_min = (last10["pts_mean"] or 0) / min_mean10
-            reb_per_min = (last10["reb_mean"] or 0) / min_mean10
-            ast_per_min = (last10["ast_mean"] or 0) / min_mean10
-            fg3_per_min = (last10["fg3_mean"] or 0) / min_mean10
-        else:
-            pts_per_min = reb_per_min = ast_per_min = fg3_per_min = 0.0
-
-        feature_row = row.to_dict()
-        feature_row.update({
-            # base rolling stats
-            "pts_last10_mean": last10["pts_mean"],
-            "pts_last10_std": last10["pts_std"],
-            "reb_last10_mean": last10["reb_mean"],
-            "reb_last10_std": last10["reb_std"],
-            "ast_last10_mean": last10["ast_mean"],
-            "ast_last10_std": last10["ast_std"],
-            "fg3_last10_mean": last10["fg3_mean"],
-            "fg3_last10_std": last10["fg3_std"],
-            "min_last10_mean": last10["min_mean"],
-            "min_last10_std": last10["min_std"],
-
-            "pts_last5_mean": last5["pts_mean"],
-            "reb_last5_mean": last5["reb_mean"],
-            "ast_last5_mean": last5["ast_mean"],
-            "fg3_last5_mean": last5["fg3_mean"],
-            "min_last5_mean": last5["min_mean"],
-
-            # per-minute
-            "pts_per_min_last10": pts_per_min,
-            "reb_per_min_last10": reb_per_min,
-            "ast_per_min_last10": ast_per_min,
-            "fg3_per_min_last10": fg3_per_min,
-
-            # pace/defense context
+        row = {"pid": pid, "player_team_api": get_player_info(pid).get("TEAM_NAME")}
+        row.update({k.replace("_", "_last10_", 1): v for k, v in last10.items()})
+        row.update({k.replace("_", "_last5_", 1): v for k, v in last5.items() if k.endswith("_mean")})
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=["pid", "player_team_api"] + PLAYER_STAT_COLUMNS)
+    df = df.astype({"pid": "int64", **{c: float for c in PLAYER_STAT_COLUMNS}})
+
+    # Per-minute rates (last10)
+    min_mean10 = df["min_last10_mean"]
+    has_minutes = min_mean10 > 0
+    for stat in ("pts", "reb", "ast", "fg3"):
+        per_min = df[f"{stat}_last10_mean"].fillna(0) / min_mean10.where(has_minutes)
+        df[f"{stat}_per_min_last10"] = np.where(has_minutes, per_min, 0.0)
+
+    return df
+
+
+def build_game_frame(games: pd.DataFrame, league_avg_row: dict) -> pd.DataFrame:
+    """
+    One row per distinct (player_team_api, home_team, away_team): resolved
+    team/opponent and home/away TEAM_NAMEs plus pace & defensive rating.
+    """
+    rows = []
+    for team_api, home_raw, away_raw in games.itertuples(index=False, name=None):
+        player_team_name, opp_team_name = resolve_game_teams(
+            team_api if isinstance(team_api, str) else None, home_raw, away_raw
+        )
+        team_row = TEAM_LOOKUP.get(player_team_name, league_avg_row)
+        opp_row = TEAM_LOOKUP.get(opp_team_name, league_avg_row)
+        rows.append({
+            "player_team_api": team_api,
+            "home_team": home_raw,
+            "away_team": away_raw,
             "player_team_name": player_team_name,
             "opp_team_name": opp_team_name,
-            "team_pace": team_pace,
-            "opp_pace": opp_pace,
-            "league_avg_pace": league_avg_pace,
-            "opp_defrtg": opp_defrtg,
-            "league_avg_defrtg": league_avg_defrtg,
-            "pace_factor": pace_factor,
-            "defense_factor": defense_factor,
+            "home_team_name": map_raw_team_to_nba(home_raw),
+            "away_team_name": map_raw_team_to_nba(away_raw),
+            "team_pace": float(team_row["PACE"]),
+            "opp_pace": float(opp_row["PACE"]),
+            "opp_defrtg": float(opp_row["DEF_RATING"]),
         })
 
-        rows.append(feature_row)
+    return pd.DataFrame(rows, columns=GAME_KEY_COLUMNS + [
+        "player_team_name", "opp_team_name", "home_team_name", "away_team_name",
+        "team_pace", "opp_pace", "opp_defrtg",
+    ])
 
-    return pd.DataFrame(rows)
 
+def build_features_v2(df_props: pd.DataFrame) -> pd.DataFrame:
+    _install_http_cache()
+    df_props = df_props.copy()
+    prop_columns = list(df_props.columns)
+
+    # Team stats load in the background while players are resolved/fetched
+    prefetch_team_stats()
+
+    unique_players = df_props["player_name"].unique()
+    print(f"[INFO V2] Unique players: {len(unique_players)}")
+
+    # Pre-resolve player IDs in batch
+    resolve_player_ids(unique_players)
+
+    # Fetch player info + game logs for all resolved players in parallel
+    player_ids = sorted({PLAYER_ID_CACHE[p] for p in unique_players} - {None})
+    prefetch_player_data(player_ids)
+
+    team_stats = get_team_stats_df()
+    league_avg_pace = team_stats["PACE"].mean()
+    league_avg_defrtg = team_stats["DEF_RATING"].mean()
+    league_avg_row = {"PACE": league_avg_pace, "DEF_RATING": league_avg_defrtg}
+
+    # Map sportsbook team names in batch
+    resolve_team_names(pd.unique(df_props[["home_team", "away_team"]].to_numpy().ravel()))
+
+    # Props without a matched player are dropped
+    df_props["pid"] = df_props["player_name"].map(PLAYER_ID_CACHE)
+    df_props = df_props[df_props["pid"].notna()].astype({"pid": "int64"})
+
+    df = df_props.merge(build_player_frame(player_ids), on="pid", how="left")
+
+    # Resolve (team, opponent) once per distinct game/team combination
+    games = df[GAME_KEY_COLUMNS].drop_duplicates()
+    df = df.merge(build_game_frame(games, league_avg_row), on=GAME_KEY_COLUMNS, how="left")
+
+    # Pace/defense context
+    df["league_avg_pace"] = league_avg_pace
+    df["league_avg_defrtg"] = league_avg_defrtg
+    df["pace_factor"] = (df["team_pace"] + df["opp_pace"]) / (2.0 * league_avg_pace)
+    # Lower DEF_RATING = better defense, so <1 means harder matchup
+    df["defense_factor"] = np.where(df["opp_defrtg"] != 0, league_avg_defrtg / df["opp_defrtg"], 1.0)
+
+    return df[prop_columns + FEATURE_COLUMNS]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build NBA prop features (v2).")
+    parser.add_argument(
+        "--warm-team-stats", action="store_true",
+        help="Only fetch league team stats into the HTTP cache, then exit.",
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true",
+        help="Clear cached NBA API responses before running.",
+    )
+    args = parser.parse_args(argv)
+
+    _install_http_cache()
+
+    if args.clear_cache:
+        clear_caches()
+        print("[INFO V2] Cleared NBA API caches")
+
+    if args.warm_team_stats:
+        team_stats = get_team_stats_df()
+        print(f"[INFO V2] Warmed team stats cache: {len(team_stats)} teams")
+        return 0
 
-if __name__ == "__main__":
-    from pathlib import Path
     PROJECT_ROOT = Path(__file__).resolve().parents[2]  # src/features_v2 -> project root
     props_path = PROJECT_ROOT / "src" / "data" / "processed" / "props_today.csv"
     df_props = pd.read_csv(props_path)
@@ -363,18 +610,19 @@ if __name__ == "__main__":
     print("[INFO V2] Building V2 features...")
     df_feat_v2 = build_features_v2(df_props)
 
-    from pathlib import Path
-
-    PROJECT_ROOT = Path(__file__).resolve().parents[2]  # src/features_v2 -> project root
     processed_dir = PROJECT_ROOT / "src" / "data" / "processed"
     processed_dir.mkdir(parents=True, exist_ok=True)
 
-    out_path = processed_dir / "props_features_v2.csv"
-    df_feat_v2.to_csv(out_path, index=False)
+    out_path = processed_dir / "props_features_v2.parquet"
+    df_feat_v2.to_parquet(out_path, engine="pyarrow", compression="zstd", index=False)
     print(f"[INFO V2] Saved V2 features → {out_path}")
 
-    df_feat_v2.to_csv(out_path, index=False)
-
     print(f"[INFO V2] Features built: {len(df_feat_v2)} props")
     print(f"[INFO V2] Saved → {out_path}")
     print(df_feat_v2.head())
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,8 @@
+import argparse
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from datetime import datetime
 from pathlib import Path
@@ -7,28 +10,49 @@ from pathlib import Path
 def build_excel_card(df, output_path: Path):
 
     # Fix team reversal
-    # Player team should NOT equal opponent team
-    # If they match, swap them.
-    df["correct_team"] = df["player_team_name"]
-    df["correct_opp"] = df["opp_team_name"]
-
-    mask = df["player_team_name"] == df["opp_team_name"]
-    df.loc[mask, "correct_team"] = df.loc[mask, "opp_team_name"]
-    df.loc[mask, "correct_opp"] = df.loc[mask, "player_team_name"]
-
-    df["player_team_name"] = df["correct_team"]
-    df["opp_team_name"] = df["correct_opp"]
-
-    df = df.drop(columns=["correct_team", "correct_opp"], errors="ignore")
+    # Opponent is whichever side of the game (home/away) the player's team is NOT on.
+    if {"home_team_name", "away_team_name"}.issubset(df.columns):
+        team = df["player_team_name"].to_numpy()
+        home = df["home_team_name"].to_numpy()
+        away = df["away_team_name"].to_numpy()
+        df["opp_team_name"] = np.where(
+            team == home, away, np.where(team == away, home, df["opp_team_name"].to_numpy())
+        )
 
     # Split overs / unders
     overs = df[df["side"] == "over"].reset_index(drop=True)
     unders = df[df["side"] == "under"].reset_index(drop=True)
 
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "NBA Prop Card"
+    # Create workbook (write-only: rows are streamed to the XML writer on save)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("NBA Prop Card")
+
+    # -------------------------
+    # AUTO WIDTHS
+    # -------------------------
+    # Write-only sheets need column widths before any row is appended
+    ws.column_dimensions["A"].width = 22  # Player
+    ws.column_dimensions["B"].width = 20  # Team
+    ws.column_dimensions["C"].width = 20  # Opponent
+    ws.column_dimensions["D"].width = 32  # Prop
+    ws.column_dimensions["E"].width = 12  # Odds
+    ws.column_dimensions["F"].width = 12  # Rating
+
+    def styled_row(values, **style):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            for attr, val in style.items():
+                setattr(cell, attr, val)
+            cells.append(cell)
+        return cells
+
+    row_num = 0
+
+    def append_row(cells):
+        nonlocal row_num
+        ws.append(cells)
+        row_num += 1
 
     # -------------------------
     # HEADER
@@ -36,12 +60,15 @@ def build_excel_card(df, output_path: Path):
     date_str = datetime.now().strftime("%m/%d/%Y")
     header_text = f"@Jayssportsanalytics – NBA Player Prop Model – {date_str}"
 
-    ws.merge_cells("A1:F1")
-    header_cell = ws["A1"]
-    header_cell.value = header_text
-    header_cell.font = Font(size=16, bold=True, color="FFFFFF")
-    header_cell.fill = PatternFill("solid", fgColor="404040")  # DARK GREY
-    header_cell.alignment = Alignment(horizontal="center", vertical="center")
+    append_row(styled_row(
+        [header_text],
+        font=Font(size=16, bold=True, color="FFFFFF"),
+        fill=PatternFill("solid", fgColor="404040"),  # DARK GREY
+        alignment=Alignment(horizontal="center", vertical="center"),
+    ))
+    ws.merged_cells.add(f"A{row_num}:F{row_num}")
+
+    append_row([])
 
     # -------------------------
     # Styles
@@ -58,107 +85,56 @@ def build_excel_card(df, output_path: Path):
     red_fill = PatternFill("solid", fgColor="F8CBAD")
 
     center = Alignment(horizontal="center", vertical="center")
+    title_font = Font(size=14, bold=True)
+    header_font = Font(bold=True)
 
     headers = ["Player", "Team", "Opponent", "Prop", "Odds", "AI Rating"]
 
-    row_cursor = 3
-
     # -------------------------
     # OVERS TITLE
     # -------------------------
-    ws.merge_cells(f"A{row_cursor}:F{row_cursor}")
-    cell = ws[f"A{row_cursor}"]
-    cell.value = "OVERS"
-    cell.font = Font(size=14, bold=True)
-    cell.fill = green_header
-    cell.alignment = center
-    row_cursor += 1
+    append_row(styled_row(["OVERS"], font=title_font, fill=green_header, alignment=center))
+    ws.merged_cells.add(f"A{row_num}:F{row_num}")
 
     # Column headers
-    for col, h in enumerate(headers, 1):
-        c = ws.cell(row=row_cursor, column=col, value=h)
-        c.font = Font(bold=True)
-        c.fill = green_header
-        c.alignment = center
-        c.border = border
-
-    row_cursor += 1
+    append_row(styled_row(headers, font=header_font, fill=green_header, alignment=center, border=border))
 
     # OVERS DATA
-    for _, row in overs.iterrows():
-        prop_name = row["market"].replace("_", " ").title()
-        prop_text = f"Over {row['line']} {prop_name}"
-
-        row_data = [
-            row["player_name"],
-            row["player_team_name"],
-            row["opp_team_name"],
+    for row in overs.itertuples(index=False):
+        prop_name = row.market.replace("_", " ").title()
+        prop_text = f"Over {row.line} {prop_name}"
+
+        append_row(styled_row([
+            row.player_name,
+            row.player_team_name,
+            row.opp_team_name,
             prop_text,
-            row["odds"],
-            f"{row['confidence']*100:.1f}"
-        ]
-
-        for col, val in enumerate(row_data, 1):
-            c = ws.cell(row=row_cursor, column=col, value=val)
-            c.alignment = center
-            c.fill = green_fill
-            c.border = border
-
-        row_cursor += 1
+            row.odds,
+            f"{row.confidence*100:.1f}"
+        ], alignment=center, fill=green_fill, border=border))
 
     # -------------------------
     # UNDERS TITLE
     # -------------------------
-    ws.merge_cells(f"A{row_cursor}:F{row_cursor}")
-    cell = ws[f"A{row_cursor}"]
-    cell.value = "UNDERS"
-    cell.font = Font(size=14, bold=True)
-    cell.fill = red_header
-    cell.alignment = center
-
-    row_cursor += 1
+    append_row(styled_row(["UNDERS"], font=title_font, fill=red_header, alignment=center))
+    ws.merged_cells.add(f"A{row_num}:F{row_num}")
 
     # Column headers
-    for col, h in enumerate(headers, 1):
-        c = ws.cell(row=row_cursor, column=col, value=h)
-        c.font = Font(bold=True)
-        c.fill = red_header
-        c.alignment = center
-        c.border = border
-
-    row_cursor += 1
+    append_row(styled_row(headers, font=header_font, fill=red_header, alignment=center, border=border))
 
     # UNDERS DATA
-    for _, row in unders.iterrows():
-        prop_name = row["market"].replace("_", " ").title()
-        prop_text = f"Under {row['line']} {prop_name}"
-
-        row_data = [
-            row["player_name"],
-            row["player_team_name"],
-            row["opp_team_name"],
+    for row in unders.itertuples(index=False):
+        prop_name = row.market.replace("_", " ").title()
+        prop_text = f"Under {row.line} {prop_name}"
+
+        append_row(styled_row([
+            row.player_name,
+            row.player_team_name,
+            row.opp_team_name,
             prop_text,
-            row["odds"],
-            f"{row['confidence']*100:.1f}"
-        ]
-
-        for col, val in enumerate(row_data, 1):
-            c = ws.cell(row=row_cursor, column=col, value=val)
-            c.alignment = center
-            c.fill = red_fill
-            c.border = border
-
-        row_cursor += 1
-
-    # -------------------------
-    # AUTO WIDTHS
-    # -------------------------
-    ws.column_dimensions["A"].width = 22  # Player
-    ws.column_dimensions["B"].width = 20  # Team
-    ws.column_dimensions["C"].width = 20  # Opponent
-    ws.column_dimensions["D"].width = 32  # Prop
-    ws.column_dimensions["E"].width = 12  # Odds
-    ws.column_dimensions["F"].width = 12  # Rating
+            row.odds,
+            f"{row.confidence*100:.1f}"
+        ], alignment=center, fill=red_fill, border=border))
 
     # Ensure output folder exists then save
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -166,17 +142,26 @@ def build_excel_card(df, output_path: Path):
     print(f"[EXCEL UPDATED V2] Saved → {output_path}")
 
 
-if __name__ == "__main__":
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export the V2 final card to Excel.")
+    parser.parse_args(argv)
+
     PROJECT_ROOT = Path(__file__).resolve().parents[1]  # src/graphics -> src -> project root is one more up?
     # safer: go to project root consistently
     PROJECT_ROOT = Path(__file__).resolve().parents[2]  # src/graphics -> project root
 
-    final_card_path = PROJECT_ROOT / "src" / "data" / "processed" / "final_card_today_v2.csv"
+    final_card_path = PROJECT_ROOT / "src" / "data" / "processed" / "final_card_today_v2.parquet"
     if not final_card_path.exists():
         raise FileNotFoundError(f"Missing final card file: {final_card_path}. Run build_portfolio_v2.py first.")
 
-    df = pd.read_csv(final_card_path)
+    df = pd.read_parquet(final_card_path)
     print(f"[V2] Loaded {len(df)} picks for today.")
 
     output_path = PROJECT_ROOT / "src" / "data" / "results" / "v2" / "final_card_v2.xlsx"
     build_excel_card(df, output_path)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,16 @@
 import sys
 import os
+import argparse
 from pathlib import Path
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
-import json
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from datetime import datetime
 
 MIN_PROB_V2 = 0.55
@@ -14,41 +19,72 @@ MIN_EV_V2   = 0.02
 MIN_CONF_V2 = 0.5
 MIN_MINUTES_V2 = 15
 
+# column → minimum value a prop needs to make the card
+FILTER_THRESHOLDS = {
+    "model_prob": MIN_PROB_V2,
+    "edge": MIN_EDGE_V2,
+    "ev_per_unit": MIN_EV_V2,
+    "confidence": MIN_CONF_V2,
+    "min_last10_mean": MIN_MINUTES_V2,
+}
+OPTIONAL_FILTER_COLUMNS = ("confidence", "min_last10_mean")
+
+# Simulation columns filtering and ranking work on; only these are converted
+# to pandas. Missing ones are skipped. The saved card keeps every column.
+SIM_COLUMNS = [
+    "player_name", "market", "side",
+    "min_last10_mean",
+    "model_prob", "edge", "ev_per_unit", "confidence",
+]
 
-def filter_props_v2(df: pd.DataFrame) -> pd.DataFrame:
-    mask = (
-        (df["model_prob"] >= MIN_PROB_V2) &
-        (df["edge"] >= MIN_EDGE_V2) &
-        (df["ev_per_unit"] >= MIN_EV_V2) &
-        (df.get("confidence", 0) >= MIN_CONF_V2) &
-        (df.get("min_last10_mean", 0) >= MIN_MINUTES_V2)
-    )
 
-    out = df[mask].copy()
-    # Deduplicate by (player, market, side)
-    out = out.sort_values(["player_name", "market", "side", "ev_per_unit"], ascending=False)
-    out = out.drop_duplicates(subset=["player_name", "market", "side"], keep="first")
-    return out
+def filter_props_v2(df: pd.DataFrame) -> pd.DataFrame:
+    # One (rows, thresholds) array compared in a single broadcast.
+    # Optional columns count as 0 when missing.
+    values = np.column_stack([
+        np.zeros(len(df)) if col in OPTIONAL_FILTER_COLUMNS and col not in df.columns
+        else df[col].to_numpy(dtype=float)
+        for col in FILTER_THRESHOLDS
+    ])
+    mask = (values >= np.fromiter(FILTER_THRESHOLDS.values(), dtype=float)).all(axis=1)
+
+    out = df[mask]
+    # Deduplicate by (player, market, side), keeping the best EV.
+    # Group keys don't need sorting: pick_card_v2 orders the survivors itself.
+    idx = out.groupby(["player_name", "market", "side"], sort=False)["ev_per_unit"].idxmax()
+    return out.loc[idx]
+
+
+def _top_k(df: pd.DataFrame, k: int) -> pd.DataFrame:
+    """
+    Top-k rows by (confidence, ev_per_unit), both descending; ties keep input order.
+    An O(n) argpartition finds the k-th best confidence, so only rows at or
+    above it (k plus any ties) get the exact lexicographic sort.
+    """
+    conf = df["confidence"].to_numpy()
+    ev = df["ev_per_unit"].to_numpy()
+
+    cand = np.arange(len(df))
+    if len(df) > k:
+        threshold = conf[np.argpartition(-conf, k - 1)[:k]].min()
+        cand = np.flatnonzero(conf >= threshold)
+
+    order = cand[np.lexsort((-ev[cand], -conf[cand]))][:k]
+    return df.iloc[order]
 
 
 def pick_card_v2(df: pd.DataFrame) -> pd.DataFrame:
-    overs = df[df["side"] == "over"].sort_values(["confidence", "ev_per_unit"], ascending=False)
-    unders = df[df["side"] == "under"].sort_values(["confidence", "ev_per_unit"], ascending=False)
-
-    selected_overs = overs.head(12)
-    selected_unders = unders.head(6)
-
-    if len(selected_overs) < 10:
-        selected_overs = overs.head(10)
-    if len(selected_unders) < 3:
-        selected_unders = unders.head(3)
+    # When fewer than K candidates exist, all of them are kept.
+    side = df["side"].to_numpy()
+    selected_overs = _top_k(df[side == "over"], 12)
+    selected_unders = _top_k(df[side == "under"], 6)
 
     final = pd.concat([selected_overs, selected_unders])
     final = final.sort_values(["confidence", "ev_per_unit"], ascending=False)
     return final
 
 
-def save_card_v2(df: pd.DataFrame):
+def save_card_v2(df: pd.DataFrame, run_ts: str | None = None):
     PROJECT_ROOT = Path(__file__).resolve().parents[2]  # src/selection_v2 -> project root
 
     results_dir = PROJECT_ROOT / "src" / "data" / "results" / "v2"
@@ -60,15 +96,17 @@ def save_card_v2(df: pd.DataFrame):
     experiments_dir = PROJECT_ROOT / "src" / "experiments" / "v2"
     experiments_dir.mkdir(parents=True, exist_ok=True)
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ts = run_ts or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
 
     card_path = results_dir / f"final_card_v2_{ts}.csv"
-    df.to_csv(card_path, index=False)
+    pa_csv.write_csv(table, card_path)
     print(f"[INFO V2] Saved V2 final card → {card_path}")
 
-    final_today_path = processed_dir / "final_card_today_v2.csv"
-    df.to_csv(final_today_path, index=False)
-    print(f"[INFO V2] Saved final_card_today_v2.csv → {final_today_path}")
+    final_today_path = processed_dir / "final_card_today_v2.parquet"
+    pq.write_table(table, final_today_path, compression="zstd")
+    print(f"[INFO V2] Saved final_card_today_v2.parquet → {final_today_path}")
 
     # Save experiment summary
     metrics = {
@@ -80,31 +118,45 @@ def save_card_v2(df: pd.DataFrame):
         "avg_confidence": float(df["confidence"].mean()) if "confidence" in df.columns and len(df) > 0 else 0.0,
     }
     metrics_path = experiments_dir / f"metrics_{ts}.json"
-    with open(metrics_path, "w") as f:
-        json.dump(metrics, f, indent=2)
+    metrics_path.write_bytes(orjson.dumps(metrics, option=orjson.OPT_INDENT_2))
     print(f"[INFO V2] Saved metrics → {metrics_path}")
 
 
-if __name__ == "__main__":
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the V2 final card from simulated props.")
+    parser.add_argument("--run-ts", help="Run timestamp for output file names; defaults to now")
+    args = parser.parse_args(argv)
+
     PROJECT_ROOT = Path(__file__).resolve().parents[2]  # src/selection_v2 -> project root
-    sims_path = PROJECT_ROOT / "src" / "data" / "processed" / "props_with_sims_today_v2.csv"
+    sims_path = PROJECT_ROOT / "src" / "data" / "processed" / "props_with_sims_today_v2.parquet"
 
     if not sims_path.exists():
         raise RuntimeError(f"Run V2 simulations first (run_simulations_v2.py). Missing: {sims_path}")
 
-    df_sims_v2 = pd.read_csv(sims_path)
+    # The sims file is a single row group, so it is read once in full; only
+    # SIM_COLUMNS go to pandas, and the picked rows are taken from the table.
+    # pandas keeps the file's RangeIndex, so picks.index are row positions.
+    sims_table = pq.read_table(sims_path)
+    df_sims_v2 = sims_table.select([c for c in SIM_COLUMNS if c in sims_table.column_names]).to_pandas()
     print(f"[INFO V2] Loaded {len(df_sims_v2)} simulated props (V2).")
 
     filtered = filter_props_v2(df_sims_v2)
     print(f"[INFO V2] Filtered to {len(filtered)} props after V2 rules.")
 
-    final_card_v2 = pick_card_v2(filtered)
+    picks = pick_card_v2(filtered)
+    final_card_v2 = sims_table.take(picks.index.to_numpy()).to_pandas()
     print(f"[INFO V2] Selected {len(final_card_v2)} final V2 picks.")
 
-    save_card_v2(final_card_v2)
+    save_card_v2(final_card_v2, run_ts=args.run_ts)
 
     print(
         final_card_v2[
             ["player_name", "market", "side", "line", "odds", "model_prob", "edge", "ev_per_unit", "confidence"]
         ].head(20)
     )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,189 +1,336 @@
 import sys
 import os
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 from datetime import datetime
+from numba import njit
+from scipy.stats import nbinom, norm, poisson
 
-from src.utils.math_helpers import american_to_implied_prob, expected_value_per_unit
+from src.utils.math_helpers import FASTMATH_FLAGS, price_props
+
+# "analytic": exact probabilities from the distribution's CDF (no sampling).
+# "mc": Monte Carlo estimate from n_sims draws per prop for continuous families;
+#       discrete families (Poisson/NB) have an exact CDF and are never sampled.
+SIM_METHODS = ("analytic", "mc")
+DEFAULT_SIM_METHOD = "analytic"
+
+# Sportsbook market spellings → canonical market
+MARKET_ALIASES = {"three-pointers-made": "threes_made", "threes": "threes_made"}
+# canonical market → (base mean column, base std column)
+MARKET_COLUMNS = {
+    "points": ("pts_last10_mean", "pts_last10_std"),
+    "assists": ("ast_last10_mean", "ast_last10_std"),
+    "rebounds": ("reb_last10_mean", "reb_last10_std"),
+    "threes_made": ("fg3_last10_mean", "fg3_last10_std"),
+}
+
+# Production draw count per Monte Carlo prop; _count_normal_hits is compiled with it as a constant
+N_SIMS = 10000
+# float32 samples per Monte Carlo tile (128 KB), small enough to stay cache-resident
+MC_TILE_SIZE = 32_768
+
+# PCG64 generator shared by the Monte Carlo path (faster than the legacy np.random globals)
+_RNG = np.random.default_rng()
 
 
 def adjust_mean(base_mean, pace_factor, defense_factor):
-    if base_mean is None or np.isnan(base_mean):
-        return np.nan
-    return float(base_mean) * float(pace_factor) * float(defense_factor)
+    return np.asarray(base_mean, dtype=float) * pace_factor * defense_factor
 
 
 def nb_params_from_mean_var(mean, var):
     """
-    Given mean and variance, compute Negative Binomial (n, p) parameters.
-    If var <= mean, return None to signal Poisson/Normal fallback.
+    Given mean and variance arrays, compute Negative Binomial (n, p) parameters.
+    Rows where var <= mean get NaN to signal Poisson/Normal fallback.
     """
-    if mean <= 0 or var <= mean:
-        return None, None
+    mean = np.asarray(mean, dtype=float)
+    var = np.asarray(var, dtype=float)
+    valid = (mean > 0) & (var > mean)
     # For NB(n, p):
     # p = mean / var
     # n = mean^2 / (var - mean)
-    p = mean / var
-    n = mean * mean / (var - mean)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = np.where(valid, mean / var, np.nan)
+        n = np.where(valid, mean * mean / (var - mean), np.nan)
     return n, p
 
 
-def simulate_points_normal(mean, std, line, n_sims=10000):
-    if np.isnan(mean) or np.isnan(line) or mean <= 0 or std <= 0:
-        return np.nan, np.nan
-    samples = np.random.normal(loc=mean, scale=std, size=n_sims)
-    samples = np.clip(samples, 0, None)
-    prob_over = float((samples > line).mean())
-    prob_under = float((samples < line).mean())
-    return prob_over, prob_under
-
-
-def simulate_poisson(mean, line, n_sims=10000):
-    if np.isnan(mean) or np.isnan(line) or mean <= 0:
-        return np.nan, np.nan
-    samples = np.random.poisson(lam=mean, size=n_sims)
-    prob_over = float((samples > line).mean())
-    prob_under = float((samples < line).mean())
-    return prob_over, prob_under
-
-
-def simulate_nb_or_poisson(mean, var, line, n_sims=10000):
-    if np.isnan(mean) or np.isnan(line) or mean <= 0:
-        return np.nan, np.nan
-
-    n, p = nb_params_from_mean_var(mean, var)
-    if n is None or p is None or p <= 0 or p >= 1:
-        # fallback to Poisson
-        return simulate_poisson(mean, line, n_sims=n_sims)
-
-    # numpy negative_binomial uses params (n, p)
-    samples = np.random.negative_binomial(n, p, size=n_sims)
-    samples = np.clip(samples, 0, None)
-    prob_over = float((samples > line).mean())
-    prob_under = float((samples < line).mean())
-    return prob_over, prob_under
-
-
-def get_adjusted_mean_and_var(row):
-    market = str(row["market"]).lower()
-    pace_factor = row.get("pace_factor", 1.0)
-    defense_factor = row.get("defense_factor", 1.0)
-
-    if market == "points":
-        base_mean = row.get("pts_last10_mean", np.nan)
-        base_std = row.get("pts_last10_std", np.nan)
-    elif market == "assists":
-        base_mean = row.get("ast_last10_mean", np.nan)
-        base_std = row.get("ast_last10_std", np.nan)
-    elif market == "rebounds":
-        base_mean = row.get("reb_last10_mean", np.nan)
-        base_std = row.get("reb_last10_std", np.nan)
-    elif market in ("threes_made", "three-pointers-made", "threes"):
-        base_mean = row.get("fg3_last10_mean", np.nan)
-        base_std = row.get("fg3_last10_std", np.nan)
-    else:
-        base_mean = np.nan
-        base_std = np.nan
+def _empty_probs(shape):
+    return np.full(shape, np.nan), np.full(shape, np.nan)
+
+
+def _discrete_probs(dist, line, *params):
+    """P(X > line), P(X < line) for an integer-valued scipy distribution."""
+    return dist.sf(np.floor(line), *params), dist.cdf(np.ceil(line) - 1, *params)
+
+
+# family → scipy distribution, taking the family's params positionally.
+# Only "normal" is ever sampled; the discrete families always use their exact CDF.
+DIST_FAMILIES = {
+    "normal": norm,  # (mean, std)
+    "poisson": poisson,  # (mean,)
+    "nb": nbinom,  # (n, p) from nb_params_from_mean_var
+}
+
+
+@njit(fastmath=FASTMATH_FLAGS, error_model="numpy", cache=True)
+def _count_normal_hits(z, mean, std, line, over, under):
+    """
+    Scale a (rows, N_SIMS) tile of standard normal draws and count hits
+    above/below each row's line in one pass. The inner trip count is the
+    compile-time constant N_SIMS, so the loop is specialized for it.
+    """
+    for i in range(z.shape[0]):
+        mu = mean[i]
+        sigma = std[i]
+        ln = line[i]
+        n_over = 0
+        n_under = 0
+        for k in range(N_SIMS):
+            x = mu + sigma * z[i, k]
+            n_over += x > ln
+            n_under += x < ln
+        over[i] += n_over
+        under[i] += n_under
+
+
+def _normal_mc_counts(mean, std, line, n_sims, rng):
+    """
+    Hit counts (samples > line, samples < line) per row for Normal draws.
+    Draws go through one reused float32 tile of at most MC_TILE_SIZE samples
+    (a few rows × a slice of n_sims), so each tile is generated, compared and
+    counted while it's still in cache instead of materializing (rows, n_sims).
+    Full-width N_SIMS tiles are scaled and counted by the _count_normal_hits kernel.
+    """
+    # float32 draws halve memory traffic; ample precision for a hit count
+    mean, std, line = (a.astype(np.float32) for a in (mean, std, line))
+    over = np.zeros(line.size, dtype=np.int64)
+    under = np.zeros(line.size, dtype=np.int64)
+
+    width = min(n_sims, MC_TILE_SIZE)
+    height = max(1, MC_TILE_SIZE // width)
+    buf = np.empty(height * width, dtype=np.float32)
+
+    for r0 in range(0, line.size, height):
+        r1 = min(r0 + height, line.size)
+        for c0 in range(0, n_sims, width):
+            cols = min(width, n_sims - c0)
+            tile = buf[: (r1 - r0) * cols].reshape(r1 - r0, cols)  # contiguous view for out=
+            rng.standard_normal(out=tile, dtype=np.float32)
+            if cols == N_SIMS:
+                _count_normal_hits(tile, mean[r0:r1], std[r0:r1], line[r0:r1], over[r0:r1], under[r0:r1])
+                continue
+            tile *= std[r0:r1, None]
+            tile += mean[r0:r1, None]
+            over[r0:r1] += np.count_nonzero(tile > line[r0:r1, None], axis=1)
+            under[r0:r1] += np.count_nonzero(tile < line[r0:r1, None], axis=1)
+    return over, under
+
+
+def _mc_probs(line, mean, std, n_sims, rng=None):
+    """Monte Carlo P(X > line), P(X < line) for Normal(mean, std) rows."""
+    rng = _RNG if rng is None else rng
+    # No clipping at 0: for the positive lines props use, negative draws count
+    # as "under" whether clipped or not, so the extra pass over samples bought nothing
+    over, under = _normal_mc_counts(mean, std, line, n_sims, rng)
+    return over / n_sims, under / n_sims
+
+
+def _mc_probs_seeded(seed, line, mean, std, n_sims):
+    """Process pool entry point: each chunk draws from its own independently seeded Generator."""
+    return _mc_probs(line, mean, std, n_sims, rng=np.random.default_rng(seed))
+
+
+def _family_probs(family, line, params, n_sims, method, workers=1):
+    dist = DIST_FAMILIES[family]
+    if family != "normal":
+        return _discrete_probs(dist, line, *params)
+    if method == "analytic":
+        return dist.sf(line, *params), dist.cdf(line, *params)
+
+    mean, std = params
+    if workers <= 1 or line.size < 2:
+        return _mc_probs(line, mean, std, n_sims)
+
+    # Rows are independent: split them across processes, with non-overlapping streams from SeedSequence.spawn
+    chunks = np.array_split(np.arange(line.size), min(workers, line.size))
+    seeds = np.random.SeedSequence().spawn(len(chunks))
+    # spawn, not fork: forking after numba's thread pool exists (any earlier
+    # price_props call) deadlocks the pool
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = list(executor.map(
+            _mc_probs_seeded,
+            seeds,
+            [line[c] for c in chunks],
+            [mean[c] for c in chunks],
+            [std[c] for c in chunks],
+            repeat(n_sims),
+        ))
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def simulate_props(market, mean, var, line, n_sims=N_SIMS, method=DEFAULT_SIM_METHOD, workers=1):
+    """
+    Over/under probabilities for every prop, grouped by distribution family:
+    points → Normal, assists/rebounds → NB (Poisson when not overdispersed),
+    everything else → Poisson. Each family is evaluated in one vectorized call
+    (Monte Carlo draws may be split across `workers` processes).
+    Returns (prob_over, prob_under, n_draws) arrays: probabilities are NaN where
+    a row can't be simulated, n_draws is the Monte Carlo sample count per row
+    (0 where the probability is exact).
+    """
+    if method == "mc" and n_sims <= 0:
+        raise ValueError(f"n_sims must be positive for Monte Carlo, got {n_sims}.")
+
+    market = np.asarray(market)
+    mean, var, line = (np.asarray(a, dtype=float) for a in (mean, var, line))
+    points = market == "points"
+    nb_market = (market == "assists") | (market == "rebounds")
+    ok = ~(np.isnan(mean) | np.isnan(line) | (mean <= 0))
+
+    # Normal: std from var, falling back to sqrt(mean)
+    with np.errstate(invalid="ignore"):
+        std = np.where(var > 0, np.sqrt(var), np.sqrt(mean))
+    # NB: if var is NaN, approximate var ~ mean + 1
+    var_used = np.where(np.isnan(var) | (var <= 0), mean + 1.0, var)
+    n, p = nb_params_from_mean_var(mean, var_used)
+    nb = ok & nb_market & (p > 0) & (p < 1)
+
+    families = {
+        "normal": (ok & points & ~(std <= 0), (mean, std)),
+        "nb": (nb, (n, p)),
+        # threes, plus NB markets that fall back to Poisson
+        "poisson": (ok & ~points & ~nb, (mean,)),
+    }
+
+    prob_over, prob_under = _empty_probs(mean.shape)
+    for family, (rows, params) in families.items():
+        if rows.any():
+            prob_over[rows], prob_under[rows] = _family_probs(
+                family, line[rows], [a[rows] for a in params], n_sims, method, workers=workers
+            )
+
+    n_draws = np.zeros(mean.shape, dtype=np.int64)
+    if method == "mc":
+        n_draws[families["normal"][0]] = n_sims
+    return prob_over, prob_under, n_draws
+
+
+def _column(df: pd.DataFrame, name: str, default: float = np.nan) -> np.ndarray:
+    if name in df.columns:
+        return df[name].to_numpy(dtype=float)
+    return np.full(len(df), default)
+
+
+def normalize_market(market: pd.Series) -> np.ndarray:
+    return market.astype(str).str.lower().replace(MARKET_ALIASES).to_numpy()
+
+
+def get_adjusted_mean_and_var(df: pd.DataFrame, market: np.ndarray):
+    """Pace/defense-adjusted mean and variance per prop; market is the normalized market array."""
+    pace_factor = _column(df, "pace_factor", 1.0)
+    defense_factor = _column(df, "defense_factor", 1.0)
+
+    # One gather per column: each row takes the stats columns of its market
+    conditions = [market == m for m in MARKET_COLUMNS]
+    base_mean = np.select(conditions, [_column(df, mean_col) for mean_col, _ in MARKET_COLUMNS.values()], np.nan)
+    base_std = np.select(conditions, [_column(df, std_col) for _, std_col in MARKET_COLUMNS.values()], np.nan)
 
     adj_mean = adjust_mean(base_mean, pace_factor, defense_factor)
-    if np.isnan(base_std):
-        adj_var = np.nan
-    else:
-        # naive: assume var scales similar to mean
-        adj_var = (base_std ** 2) * (pace_factor * defense_factor)
+    # naive: assume var scales similar to mean
+    adj_var = (base_std ** 2) * (pace_factor * defense_factor)
 
     return adj_mean, adj_var
 
 
-def run_simulations_v2(df_features: pd.DataFrame, n_sims: int = 10000) -> pd.DataFrame:
-    rows = []
-
-    for _, row in df_features.iterrows():
-        market = row["market"]
-        side = row["side"]
-        line = row["line"]
-        odds = row["odds"]
-
-        mean, var = get_adjusted_mean_and_var(row)
-
-        if np.isnan(mean) or np.isnan(line):
-            model_prob = np.nan
-        else:
-            if market == "points":
-                # Normal
-                std = np.sqrt(var) if var and not np.isnan(var) and var > 0 else np.sqrt(mean)
-                p_over, p_under = simulate_points_normal(mean, std, line, n_sims=n_sims)
-            elif market == "assists" or market == "rebounds":
-                # NB/Poisson mixture
-                # If var is NaN, approximate var ~ mean + 1
-                if np.isnan(var) or var <= 0:
-                    var_used = mean + 1.0
-                else:
-                    var_used = var
-                p_over, p_under = simulate_nb_or_poisson(mean, var_used, line, n_sims=n_sims)
-            else:  # threes
-                p_over, p_under = simulate_poisson(mean, line, n_sims=n_sims)
-
-            model_prob = p_over if side == "over" else p_under
-
-        implied_prob = american_to_implied_prob(odds)
-        edge = model_prob - implied_prob if (model_prob == model_prob and implied_prob == implied_prob) else np.nan
-        ev = expected_value_per_unit(odds, model_prob) if model_prob == model_prob else np.nan
-
-        # Confidence: combine prob, edge magnitude, minutes
-        min10 = row.get("min_last10_mean", np.nan)
-        prob_component = model_prob if model_prob == model_prob else 0.0
-        edge_component = abs(edge) if edge == edge else 0.0
-        minutes_component = min(min10 / 36.0, 1.0) if min10 == min10 else 0.0
-
-        confidence = float((prob_component + edge_component + minutes_component) / 3.0)
-
-        out = row.to_dict()
-        out.update({
-            "adj_mean": mean,
-            "adj_var": var,
-            "model_prob": model_prob,
-            "implied_prob": implied_prob,
-            "edge": edge,
-            "ev_per_unit": ev,
-            "confidence": confidence,
-            "n_sims": n_sims,
-        })
-        rows.append(out)
-
-    return pd.DataFrame(rows)
-
-
-def save_sim_results_v2(df: pd.DataFrame):
+def run_simulations_v2(
+    df_features: pd.DataFrame, n_sims: int = N_SIMS, method: str = DEFAULT_SIM_METHOD, workers: int = 1
+) -> pd.DataFrame:
+    if method not in SIM_METHODS:
+        raise ValueError(f"Unknown simulation method {method!r}. Expected one of {SIM_METHODS}.")
+
+    market = normalize_market(df_features["market"])
+    side = df_features["side"].to_numpy()
+    line = df_features["line"].to_numpy(dtype=float)
+    odds = df_features["odds"].to_numpy(dtype=float)
+
+    mean, var = get_adjusted_mean_and_var(df_features, market)
+
+    p_over, p_under, n_draws = simulate_props(market, mean, var, line, n_sims=n_sims, method=method, workers=workers)
+
+    model_prob = np.where(side == "over", p_over, p_under)
+
+    min10 = _column(df_features, "min_last10_mean")
+    implied_prob, edge, ev, confidence = price_props(model_prob, odds, min10)
+
+    # Features plus one new column per output array; reruns overwrite existing columns in place
+    df_out = df_features.reset_index(drop=True)
+    df_out["adj_mean"] = mean
+    df_out["adj_var"] = var
+    df_out["model_prob"] = model_prob
+    df_out["implied_prob"] = implied_prob
+    df_out["edge"] = edge
+    df_out["ev_per_unit"] = ev
+    df_out["confidence"] = confidence
+    # Draws actually taken per row; 0 where the probability is exact
+    df_out["n_sims"] = n_draws
+    return df_out
+
+
+def save_sim_results_v2(df: pd.DataFrame, run_ts: str | None = None):
     # Standardize all outputs under src/data
     PROJECT_ROOT = Path(__file__).resolve().parents[2]  # src/simulations_v2 -> project root
     results_dir = PROJECT_ROOT / "src" / "data" / "results" / "v2"
     results_dir.mkdir(parents=True, exist_ok=True)
 
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ts = run_ts or datetime.now().strftime("%Y%m%d_%H%M%S")
     path_full = results_dir / f"sim_results_v2_{ts}.csv"
 
-    df.to_csv(path_full, index=False)
+    # Convert once; both writers serialize the same Arrow table
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    pa_csv.write_csv(table, path_full)
     print(f"[INFO V2] Saved sim results → {path_full}")
 
-    processed_path = PROJECT_ROOT / "src" / "data" / "processed" / "props_with_sims_today_v2.csv"
+    processed_path = PROJECT_ROOT / "src" / "data" / "processed" / "props_with_sims_today_v2.parquet"
     processed_path.parent.mkdir(parents=True, exist_ok=True)
 
-    df.to_csv(processed_path, index=False)
-    print(f"[INFO V2] Saved props_with_sims_today_v2.csv → {processed_path}")
-
-
-if __name__ == "__main__":
-    from pathlib import Path
+    pq.write_table(table, processed_path, compression="zstd")
+    print(f"[INFO V2] Saved props_with_sims_today_v2.parquet → {processed_path}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run V2 prop simulations.")
+    parser.add_argument(
+        "--method",
+        choices=SIM_METHODS,
+        default=DEFAULT_SIM_METHOD,
+        help=f"analytic: exact CDF probabilities (default); mc: Monte Carlo with {N_SIMS} draws per Normal prop",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes to split Monte Carlo draws across (--method mc only).",
+    )
+    parser.add_argument("--run-ts", help="Run timestamp for output file names; defaults to now")
+    args = parser.parse_args(argv)
 
     PROJECT_ROOT = Path(__file__).resolve().parents[2]  # src/simulations_v2 -> project root
     processed_dir = PROJECT_ROOT / "src" / "data" / "processed"
 
     candidate_files = [
+        processed_dir / "props_features_v2.parquet",
         processed_dir / "props_features_today_v2.csv",
         processed_dir / "props_features_v2.csv",
         processed_dir / "props_features_today.csv",
@@ -197,11 +344,22 @@ if __name__ == "__main__":
             + "\n".join(str(p) for p in candidate_files)
         )
 
-    df_features_v2 = pd.read_csv(features_path)
+    if features_path.suffix == ".parquet":
+        df_features_v2 = pd.read_parquet(features_path)
+    else:
+        df_features_v2 = pd.read_csv(features_path)
     print(f"[INFO V2] Loaded {len(df_features_v2)} props with V2 features from {features_path}.")
 
-    df_sims_v2 = run_simulations_v2(df_features_v2, n_sims=10000)
+    df_sims_v2 = run_simulations_v2(
+        df_features_v2, n_sims=N_SIMS, method=args.method, workers=args.workers
+    )
     print(f"[INFO V2] Simulated {len(df_sims_v2)} props.")
 
-    save_sim_results_v2(df_sims_v2)
+    save_sim_results_v2(df_sims_v2, run_ts=args.run_ts)
     print(df_sims_v2.head())
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
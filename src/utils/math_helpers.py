@@ -1,45 +1,115 @@
 import numpy as np
+from numba import njit, vectorize
+
+# fastmath without "nnan"/"ninf": pricing relies on NaN checks for missing odds/probs
+FASTMATH_FLAGS = {"nsz", "arcp", "contract", "afn", "reassoc"}
 
-def american_to_implied_prob(odds: float) -> float:
-    """
-    Convert American odds to implied probability (no vig removed).
-    Returns a float between 0 and 1.
-    """
-    if odds is None or np.isnan(odds):
-        return np.nan
 
+# Scalar formulas: the single source for both the public helpers and price_props
+
+@njit(error_model="numpy", cache=True)
+def _implied_prob(odds):
     if odds > 0:
         return 100.0 / (odds + 100.0)
-    else:
-        return (-odds) / (-odds + 100.0)
+    return (-odds) / (-odds + 100.0)
+
+
+@njit(error_model="numpy", cache=True)
+def _profit_per_unit(odds):
+    # Profit on a winning 1-unit stake
+    if odds > 0:
+        return odds / 100.0
+    return 100.0 / -odds
+
+
+@njit(error_model="numpy", cache=True)
+def _expected_value(odds, win_prob, stake):
+    return win_prob * stake * _profit_per_unit(odds) - (1.0 - win_prob) * stake
+
+
+@vectorize(["float64(float64)"], cache=True)
+def _implied_prob_ufunc(odds):
+    return _implied_prob(odds)
+
+
+@vectorize(["float64(float64)"], cache=True)
+def _decimal_ufunc(odds):
+    return 1.0 + _profit_per_unit(odds)
+
+
+@vectorize(["float64(float64, float64, float64)"], cache=True)
+def _expected_value_ufunc(odds, win_prob, stake):
+    return _expected_value(odds, win_prob, stake)
 
 
-def american_to_decimal(odds: float) -> float:
+def _as_float_array(values) -> np.ndarray:
+    # None → NaN, scalars → 0-d arrays
+    return np.asarray(values, dtype=float)
+
+
+def _unwrap(values: np.ndarray):
+    # Scalar in, float out; array in, array out
+    return float(values) if np.ndim(values) == 0 else values
+
+
+def american_to_implied_prob(odds):
     """
-    Convert American odds to decimal odds.
+    Convert American odds to implied probability (no vig removed).
+    Accepts a scalar or an array; returns values between 0 and 1 (NaN where odds are missing).
     """
-    if odds is None or np.isnan(odds):
-        return np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = _implied_prob_ufunc(_as_float_array(odds))
+    return _unwrap(values)
 
-    if odds > 0:
-        return 1.0 + odds / 100.0
-    else:
-        return 1.0 + 100.0 / -odds
 
+def american_to_decimal(odds):
+    """
+    Convert American odds to decimal odds (scalar or array).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = _decimal_ufunc(_as_float_array(odds))
+    return _unwrap(values)
 
-def expected_value_per_unit(odds: float, win_prob: float, stake: float = 1.0) -> float:
+
+def expected_value_per_unit(odds, win_prob, stake: float = 1.0):
     """
-    Expected profit per unit staked given American odds and win probability.
+    Expected profit per unit staked given American odds and win probability
+    (scalars or broadcastable arrays; NaN where either input is missing).
     """
-    if odds is None or np.isnan(odds) or win_prob is None or np.isnan(win_prob):
-        return np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = _expected_value_ufunc(_as_float_array(odds), _as_float_array(win_prob), float(stake))
+    return _unwrap(values)
 
-    # Payout per 1 unit if it wins
-    if odds > 0:
-        payout = stake * (odds / 100.0)
-    else:
-        payout = stake * (100.0 / -odds)
 
-    lose_prob = 1.0 - win_prob
-    ev = win_prob * payout - lose_prob * stake
-    return ev
+@njit(fastmath=FASTMATH_FLAGS, error_model="numpy", cache=True)
+def price_props(model_prob, odds, min_last10):
+    """
+    Fused per-prop pricing: implied prob, edge, EV per unit and confidence in one pass
+    over 1-d float arrays. NaN propagates from missing odds/probs.
+    Serial on purpose: a slate is a few hundred rows, too few to pay for a thread
+    pool, and a parallel kernel launched off the main thread can hang shutdown
+    under numba's TBB layer.
+    """
+    n = model_prob.size
+    implied_prob = np.empty(n)
+    edge = np.empty(n)
+    ev = np.empty(n)
+    confidence = np.empty(n)
+
+    for i in range(n):
+        prob = model_prob[i]
+        o = odds[i]
+        implied = _implied_prob(o)
+        e = prob - implied
+        implied_prob[i] = implied
+        edge[i] = e
+        ev[i] = _expected_value(o, prob, 1.0)
+
+        # Confidence: combine prob, edge magnitude, minutes
+        m = min_last10[i]
+        prob_component = 0.0 if np.isnan(prob) else prob
+        edge_component = 0.0 if np.isnan(e) else abs(e)
+        minutes_component = 0.0 if np.isnan(m) else min(m / 36.0, 1.0)
+        confidence[i] = (prob_component + edge_component + minutes_component) / 3.0
+
+    return implied_prob, edge, ev, confidence
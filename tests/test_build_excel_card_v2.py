@@ -0,0 +1,26 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from src.graphics.build_excel_card_v2 import build_excel_card
+
+
+def test_opponent_is_the_other_side_of_the_game(tmp_path):
+    # opp_team_name arrives reversed (the player's own team); the card fixes it
+    df = pd.DataFrame({
+        "player_name": ["Home Player", "Away Player"],
+        "player_team_name": ["Boston Celtics", "Miami Heat"],
+        "opp_team_name": ["Boston Celtics", "Miami Heat"],
+        "home_team_name": ["Boston Celtics", "Boston Celtics"],
+        "away_team_name": ["Miami Heat", "Miami Heat"],
+        "market": ["points", "rebounds"],
+        "side": ["over", "under"],
+        "line": [24.5, 7.5],
+        "odds": [-110, -115],
+        "confidence": [0.8, 0.7],
+    })
+    out = tmp_path / "card.xlsx"
+    build_excel_card(df, out)
+
+    rows = {r[0]: r for r in load_workbook(out).active.iter_rows(values_only=True) if r}
+    assert rows["Home Player"][2] == "Miami Heat"
+    assert rows["Away Player"][2] == "Boston Celtics"
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features_v2 import build_features_v2 as bf
+
+STAT_COLUMNS = ["PTS", "REB", "AST", "FG3M", "MIN"]
+
+PLAYERS = [
+    {"id": 1, "full_name": "LeBron James"},
+    {"id": 2, "full_name": "Jayson Tatum"},
+    {"id": 3, "full_name": "Jimmy Butler"},
+    {"id": 4, "full_name": "Stephen Curry"},
+    {"id": 5, "full_name": "Anthony Davis"},
+    {"id": 6, "full_name": "Jaylen Brown"},
+]
+PLAYER_TEAMS = {
+    1: "Los Angeles Lakers",
+    2: "Boston Celtics",
+    4: "Golden State Warriors",
+    5: "Los Angeles Lakers",
+    6: "Boston Celtics",
+}
+INFO_FAILS = {3}
+LOG_FAILS = {5}
+EMPTY_LOGS = {4}
+
+TEAM_STATS = pd.DataFrame({
+    "TEAM_NAME": ["Los Angeles Lakers", "Boston Celtics", "Miami Heat", "Golden State Warriors"],
+    "FGA": [88.0, 90.0, 85.0, 91.0],
+    "FTA": [24.0, 20.0, 22.0, 19.0],
+    "OREB": [10.0, 11.0, 9.0, 12.0],
+    "TOV": [14.0, 12.0, 13.0, 15.0],
+    "PTS": [115.0, 118.0, 109.0, 117.0],
+    "PLUS_MINUS": [2.0, 6.5, -1.5, 0.5],
+    "MIN": [48.0, 48.0, 48.0, 48.0],
+})
+
+
+class FakeEndpoint:
+    def __init__(self, frame):
+        self._frame = frame
+
+    def get_data_frames(self):
+        return [self._frame]
+
+
+def fake_player_info(player_id):
+    if player_id in INFO_FAILS:
+        raise ConnectionError("timeout")
+    return FakeEndpoint(pd.DataFrame({
+        "TEAM_NAME": [PLAYER_TEAMS[player_id]],
+        "TEAM_ABBREVIATION": [PLAYER_TEAMS[player_id][:3].upper()],
+    }))
+
+
+def fake_game_log(player_id, season):
+    if player_id in LOG_FAILS:
+        raise ConnectionError("timeout")
+    if player_id in EMPTY_LOGS:
+        return FakeEndpoint(pd.DataFrame({c: pd.Series(dtype=float) for c in STAT_COLUMNS}))
+    rng = np.random.default_rng(player_id)
+    return FakeEndpoint(pd.DataFrame(rng.integers(0, 40, size=(12, len(STAT_COLUMNS))), columns=STAT_COLUMNS))
+
+
+def fake_team_stats(**kwargs):
+    return FakeEndpoint(TEAM_STATS.copy())
+
+
+@pytest.fixture
+def fake_nba(monkeypatch):
+    monkeypatch.setattr(bf, "get_all_players", lambda: PLAYERS)
+    monkeypatch.setattr(bf, "_install_http_cache", lambda: None)
+    monkeypatch.setattr(bf.commonplayerinfo, "CommonPlayerInfo", fake_player_info)
+    monkeypatch.setattr(bf.playergamelog, "PlayerGameLog", fake_game_log)
+    monkeypatch.setattr(bf.leaguedashteamstats, "LeagueDashTeamStats", fake_team_stats)
+    monkeypatch.setattr(bf, "TEAM_STATS_DF", None)
+    monkeypatch.setattr(bf, "TEAM_LOOKUP", {})
+    monkeypatch.setattr(bf, "_TEAM_STATS_FUTURE", None)
+
+    def reset():
+        for cached in (bf._normalized_index, bf._player_name_index, bf._player_full_name_index,
+                       bf._fuzzy_match_cached, bf._player_info, bf._game_log, bf._last_n_stats):
+            cached.cache_clear()
+        bf.PLAYER_ID_CACHE.clear()
+        bf.TEAM_NAME_CACHE.clear()
+
+    reset()
+    yield
+    reset()
+
+
+def baseline_build_features(df_props: pd.DataFrame) -> pd.DataFrame:
+    """The pre-vectorization row loop, on top of the same (cached) fetch helpers."""
+    team_stats = bf.get_team_stats_df()
+    league_avg_pace = team_stats["PACE"].mean()
+    league_avg_defrtg = team_stats["DEF_RATING"].mean()
+
+    for p in df_props["player_name"].unique():
+        bf.get_player_id(p)
+
+    rows = []
+    for _, row in df_props.iterrows():
+        pid = bf.PLAYER_ID_CACHE.get(row["player_name"])
+        if pid is None:
+            continue
+
+        player_team_name = bf.get_player_info(pid).get("TEAM_NAME") or None
+        home_team_name = bf.map_raw_team_to_nba(row["home_team"])
+        away_team_name = bf.map_raw_team_to_nba(row["away_team"])
+
+        if player_team_name:
+            matched, _ = bf.fuzzy_match_name(player_team_name, [home_team_name, away_team_name], min_score=50)
+            if matched:
+                player_team_name = matched
+
+        if player_team_name == home_team_name:
+            opp_team_name = away_team_name
+        elif player_team_name == away_team_name:
+            opp_team_name = home_team_name
+        else:
+            _, home_score = bf.fuzzy_match_name(player_team_name, [home_team_name], min_score=50)
+            _, away_score = bf.fuzzy_match_name(player_team_name, [away_team_name], min_score=50)
+            if home_score > away_score:
+                player_team_name, opp_team_name = home_team_name, away_team_name
+            else:
+                player_team_name, opp_team_name = away_team_name, home_team_name
+
+        team_row = team_stats[team_stats["TEAM_NAME"] == player_team_name] if player_team_name else pd.DataFrame()
+        opp_row = team_stats[team_stats["TEAM_NAME"] == opp_team_name] if opp_team_name else pd.DataFrame()
+        team_pace = float(team_row.iloc[0]["PACE"]) if not team_row.empty else league_avg_pace
+        if not opp_row.empty:
+            opp_pace = float(opp_row.iloc[0]["PACE"])
+            opp_defrtg = float(opp_row.iloc[0]["DEF_RATING"])
+        else:
+            opp_pace, opp_defrtg = league_avg_pace, league_avg_defrtg
+
+        last10 = bf.get_last_n_stats(pid, n=10)
+        last5 = bf.get_last_n_stats(pid, n=5)
+        min_mean10 = last10["min_mean"] or 0
+        per_min = {
+            stat: (last10[f"{stat}_mean"] or 0) / min_mean10 if min_mean10 > 0 else 0.0
+            for stat in ("pts", "reb", "ast", "fg3")
+        }
+
+        feature_row = row.to_dict()
+        feature_row.update({k.replace("_", "_last10_", 1): v for k, v in last10.items()})
+        feature_row.update({k.replace("_", "_last5_", 1): v for k, v in last5.items() if k.endswith("_mean")})
+        feature_row.update({f"{stat}_per_min_last10": v for stat, v in per_min.items()})
+        feature_row.update({
+            "player_team_name": player_team_name,
+            "opp_team_name": opp_team_name,
+            "team_pace": team_pace,
+            "opp_pace": opp_pace,
+            "league_avg_pace": league_avg_pace,
+            "opp_defrtg": opp_defrtg,
+            "league_avg_defrtg": league_avg_defrtg,
+            "pace_factor": (team_pace + opp_pace) / (2.0 * league_avg_pace),
+            "defense_factor": league_avg_defrtg / opp_defrtg if opp_defrtg else 1.0,
+        })
+        rows.append(feature_row)
+
+    return pd.DataFrame(rows)
+
+
+def test_build_features_matches_row_loop(fake_nba):
+    df_props = pd.DataFrame({
+        "player_name": [
+            "LeBron James",   # home player
+            "Jayson Tatumm",  # fuzzy name, away player
+            "Jimmy Butler",   # player info request fails
+            "Stephen Curry",  # empty game log
+            "Anthony Davis",  # game log request fails
+            "Zzqx Wubble",    # no player match: dropped
+            "Jaylen Brown",   # team is neither home nor away
+            "LeBron James",
+        ],
+        "market": ["points", "rebounds", "assists", "points", "rebounds", "points", "threes", "assists"],
+        "side": ["over", "under", "over", "under", "over", "over", "under", "under"],
+        "line": [25.5, 8.5, 4.5, 27.5, 11.5, 10.5, 2.5, 7.5],
+        "odds": [-110, 105, -120, -115, 100, -110, 120, -105],
+        "home_team": ["Los Angeles Lakers", "Los Angeles Lakers", "Miami Heat", "Golden State Warriors",
+                      "Los Angeles Lakers", "Miami Heat", "Miami Heat", "Los Angeles Lakers"],
+        "away_team": ["Boston Celtics", "Boston Celtics", "Boston Celtics", "Miami Heat",
+                      "Boston Celtics", "Boston Celtics", "Golden State Warriors", "Boston Celtics"],
+    })
+
+    new = bf.build_features_v2(df_props)
+    old = baseline_build_features(df_props)
+
+    assert list(new["player_name"]) == [p for p in df_props["player_name"] if p != "Zzqx Wubble"]
+    assert (new["home_team_name"] == new["home_team"]).all()
+    assert (new["away_team_name"] == new["away_team"]).all()
+    pd.testing.assert_frame_equal(
+        new.drop(columns=["home_team_name", "away_team_name"]).reset_index(drop=True),
+        old[[c for c in new.columns if c not in ("home_team_name", "away_team_name")]],
+        check_dtype=False,
+    )
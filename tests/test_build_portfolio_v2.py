@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from src.selection_v2.build_portfolio_v2 import _top_k
+
+
+def sort_head(df: pd.DataFrame, k: int) -> pd.DataFrame:
+    # The selection _top_k replaced
+    return df.sort_values(["confidence", "ev_per_unit"], ascending=False).head(k)
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4, 6, 7, 10])
+def test_top_k_matches_sort_head_on_ties(k):
+    # Ties at the k-th confidence, some broken by EV and some full ties
+    df = pd.DataFrame(
+        {
+            "confidence": [0.9, 0.7, 0.7, 0.8, 0.7, 0.7, 0.6],
+            "ev_per_unit": [0.05, 0.03, 0.08, 0.02, 0.03, 0.03, 0.10],
+        },
+        index=[10, 11, 12, 13, 14, 15, 16],
+    )
+    pd.testing.assert_frame_equal(_top_k(df, k), sort_head(df, k))
+
+
+def test_top_k_keeps_everything_when_short():
+    df = pd.DataFrame({"confidence": [0.6, 0.8, 0.6], "ev_per_unit": [0.02, 0.01, 0.02]})
+    for k in (3, 12):
+        pd.testing.assert_frame_equal(_top_k(df, k), sort_head(df, k))
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# The pipeline runs steps in-process; price_props called from a non-main
+# thread used to leave the interpreter stuck at shutdown (numba TBB layer)
+SCRIPT = textwrap.dedent("""
+    import threading
+    import numpy as np
+    from src.utils.math_helpers import price_props
+
+    def step():
+        prob = np.linspace(0.4, 0.7, 300)
+        odds = np.full(300, -110.0)
+        minutes = np.full(300, 30.0)
+        implied, edge, ev, confidence = price_props(prob, odds, minutes)
+        assert np.isfinite(confidence).all()
+
+    t = threading.Thread(target=step)
+    t.start()
+    t.join()
+    step()
+    print("ok")
+""")
+
+
+def test_price_props_off_main_thread_exits():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
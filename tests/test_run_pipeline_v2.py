@@ -0,0 +1,43 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Run in a child interpreter so a pipeline that never exits fails the test
+# instead of hanging the whole session
+SCRIPT = textwrap.dedent("""
+    import asyncio
+    import sys
+    from pathlib import Path
+
+    import numpy as np
+    from run_pipeline_v2 import Step, run_pipeline
+    from src.utils.math_helpers import price_props
+
+    def step(argv):
+        n = 300
+        price_props(np.full(n, 0.6), np.full(n, -110.0), np.full(n, 30.0))
+        return 0
+
+    if __name__ == "__main__":
+        steps = [
+            Step("Price", Path("price.py"), entrypoint="__main__:step"),
+            Step("Price again", Path("price.py"), deps=frozenset({"Price"}), entrypoint="__main__:step"),
+        ]
+        asyncio.run(run_pipeline(steps, python=sys.executable, cwd=Path("."), max_parallel=2, isolate=False))
+        print("ok")
+""")
+
+
+def test_in_process_steps_let_the_interpreter_exit():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
@@ -0,0 +1,131 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import nbinom, norm, poisson
+
+from src.simulations_v2.run_simulations_v2 import (
+    MC_TILE_SIZE,
+    N_SIMS,
+    _discrete_probs,
+    _mc_probs,
+    nb_params_from_mean_var,
+    run_simulations_v2,
+    simulate_props,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Run in a child interpreter so a deadlocked process pool fails the test
+# instead of hanging the whole session
+SCRIPT = textwrap.dedent("""
+    import numpy as np
+    import pandas as pd
+    from src.simulations_v2.run_simulations_v2 import run_simulations_v2
+
+    if __name__ == "__main__":
+        df = pd.DataFrame({
+            "market": ["points"] * 6,
+            "side": ["over", "under"] * 3,
+            "line": [20.5] * 6,
+            "odds": [-110.0] * 6,
+            "pts_last10_mean": np.linspace(15, 25, 6),
+            "pts_last10_std": [4.0] * 6,
+        })
+        for _ in range(2):
+            out = run_simulations_v2(df, method="mc", workers=2)
+            assert out["model_prob"].between(0, 1).all()
+            assert (out["n_sims"] > 0).all()
+        print("ok")
+""")
+
+
+def test_mc_workers_survive_repeated_calls():
+    # The second call used to fork after numba's thread pool existed and deadlock
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("ok")
+
+
+def test_discrete_probs_integer_line_is_a_push_on_both_sides():
+    line = np.array([3.0])
+    mean = np.array([2.5])
+    p_over, p_under = _discrete_probs(poisson, line, mean)
+
+    # Landing exactly on 3 counts as neither over nor under
+    assert np.allclose(p_over, poisson.sf(3, mean))
+    assert np.allclose(p_under, poisson.cdf(2, mean))
+    assert np.allclose(p_over + p_under + poisson.pmf(3, mean), 1.0)
+
+
+def test_discrete_probs_half_line_splits_all_mass():
+    line = np.array([4.5, 0.5])
+    n, p = nb_params_from_mean_var(np.array([5.0, 1.2]), np.array([8.0, 2.0]))
+    p_over, p_under = _discrete_probs(nbinom, line, n, p)
+
+    assert np.allclose(p_over, nbinom.sf(np.floor(line), n, p))
+    assert np.allclose(p_under, nbinom.cdf(np.floor(line), n, p))
+    assert np.allclose(p_over + p_under, 1.0)
+
+
+def test_analytic_matches_monte_carlo():
+    rng = np.random.default_rng(0)
+    n_sims = 200_000
+    tol = 4 * np.sqrt(0.25 / n_sims)  # 4 sigma of a binomial proportion
+
+    # Discrete families: closed form vs brute-force draws
+    mean = np.array([1.5, 4.0, 7.0])
+    line = np.array([1.0, 4.5, 6.0])
+    p_over, p_under = _discrete_probs(poisson, line, mean)
+    draws = rng.poisson(mean[:, None], size=(len(mean), n_sims))
+    assert np.allclose(p_over, (draws > line[:, None]).mean(axis=1), atol=tol)
+    assert np.allclose(p_under, (draws < line[:, None]).mean(axis=1), atol=tol)
+
+    # Normal family: default analytic path vs --method mc
+    df = pd.DataFrame({
+        "market": ["points", "points", "assists", "threes"],
+        "side": ["over", "under", "over", "under"],
+        "line": [20.5, 18.5, 6.5, 2.5],
+        "odds": [-110.0] * 4,
+        "pts_last10_mean": [22.0, 22.0, np.nan, np.nan],
+        "pts_last10_std": [5.0, 5.0, np.nan, np.nan],
+        "ast_last10_mean": [np.nan, np.nan, 7.0, np.nan],
+        "ast_last10_std": [np.nan, np.nan, 3.0, np.nan],
+        "fg3_last10_mean": [np.nan, np.nan, np.nan, 2.2],
+        "fg3_last10_std": [np.nan, np.nan, np.nan, 1.4],
+    })
+    analytic = run_simulations_v2(df, method="analytic")
+    mc = run_simulations_v2(df, method="mc")
+    # N_SIMS draws per Normal row; discrete rows are exact in both modes
+    assert np.allclose(analytic["model_prob"], mc["model_prob"], atol=4 * np.sqrt(0.25 / 10_000))
+    assert (analytic["n_sims"] == 0).all()
+    assert (mc["n_sims"] == [10_000, 10_000, 0, 0]).all()
+
+
+@pytest.mark.parametrize("n_sims", [N_SIMS, 7_000, MC_TILE_SIZE + 17_232])
+def test_normal_mc_hit_counts_match_cdf(n_sims):
+    # N_SIMS goes through the numba kernel, other widths through the numpy
+    # tile path (the last one spans two column tiles)
+    mean = np.array([22.0, 8.0, 30.0, 15.0, 5.5])
+    std = np.array([5.0, 2.5, 6.0, 4.0, 1.5])
+    line = np.array([20.5, 8.5, 35.5, 9.5, 5.5])
+    p_over, p_under = _mc_probs(line, mean, std, n_sims, rng=np.random.default_rng(1))
+
+    tol = 4 * np.sqrt(0.25 / n_sims)
+    assert np.allclose(p_over, norm.sf(line, mean, std), atol=tol)
+    assert np.allclose(p_under, norm.cdf(line, mean, std), atol=tol)
+
+
+def test_mc_rejects_non_positive_n_sims():
+    with pytest.raises(ValueError):
+        simulate_props(["points"], [20.0], [16.0], [19.5], n_sims=0, method="mc")